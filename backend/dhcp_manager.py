@@ -5,119 +5,363 @@ Handles interaction with Kea DHCP server including configuration management,
 lease queries, and reservation management.
 """
 
+import copy
 import json
+import re
+import socket
 import subprocess
 import tempfile
 import os
 import csv
 import time
-from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
+from io import TextIOWrapper
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterable, List, Optional, Any
+
+# dbus-python is optional; service status falls back to systemctl without it
+try:
+    import dbus
+except ImportError:
+    dbus = None
+
+# orjson is optional; fall back to the standard library when it isn't installed
+try:
+    import orjson
+    
+    _json_loads = orjson.loads
+    
+    def _json_dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    def _json_loads(data: Any) -> Any:
+        return json.loads(bytes(data) if isinstance(data, memoryview) else data)
+    
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj, indent=4).encode('utf-8')
+
+# Six hex octets separated by ':' or '-'
+_MAC_RE = re.compile(r'[0-9a-fA-F]{2}(?:[:-][0-9a-fA-F]{2}){5}')
 
 class DhcpManager:
     """Manages Kea DHCP server operations."""
     
     CONFIG_PATH = Path("/etc/kea/kea-dhcp4.conf")
     LEASE_DB_PATH = Path("/var/lib/kea/kea-leases4.csv")
+    CTRL_SOCKET_PATH = Path("/run/kea/kea4-ctrl-socket")
+    SERVICE_UNIT_PATH = "/org/freedesktop/systemd1/unit/kea_2ddhcp4_2dserver_2eservice"
+    
+    # Reserved range for pinned reservations as integers (192.168.123.2 - 192.168.123.49)
+    RESERVED_START_INT = 0xC0A87B02
+    RESERVED_END_INT = 0xC0A87B31
+    
+    # Parsed configs keyed by path -> (st_mtime_ns, st_size, config)
+    _config_cache: Dict[Path, tuple[int, int, Dict[str, Any]]] = {}
+    # Flattened reservation lists, keyed the same way as _config_cache
+    _reservations_cache: Dict[Path, tuple[int, int, List[Dict[str, Any]]]] = {}
+    # MAC/IP -> (subnet index, reservation index), keyed the same way as _config_cache
+    _reservation_index_cache: Dict[Path, tuple[int, int, Dict[str, tuple[int, int]]]] = {}
+    # First pool's (start, end) as integers, keyed the same way as _config_cache
+    _pool_range_cache: Dict[Path, tuple[int, int, Optional[tuple[Optional[int], Optional[int]]]]] = {}
+    # Parsed leases keyed by lease file path -> (st_mtime_ns, st_size, [(expire, lease)])
+    _lease_cache: Dict[Path, tuple[int, int, List[tuple[int, Dict[str, Any]]]]] = {}
+    
+    # Seconds a service state lookup is reused, so /status and /health polls share one query
+    STATUS_CACHE_TTL = 2.0
+    # (monotonic expiry, unit properties) from the last service state lookup
+    _status_cache: Optional[tuple[float, Optional[Dict[str, str]]]] = None
     
     def __init__(self):
         """Initialize DHCP manager."""
         self.config_path = self.CONFIG_PATH
         self.lease_db_path = self.LEASE_DB_PATH
+        self.ctrl_socket_path = self.CTRL_SOCKET_PATH
+        self._unit_props_iface = None
     
-    def _run_sudo_command(self, command: List[str]) -> tuple[bool, str]:
-        """Execute a sudo command and return success status and output."""
+    def _run_sudo_command(self, command: List[str], capture: bool = True, timeout: int = 5) -> tuple[bool, str]:
+        """Execute a sudo command and return success status and output.
+        
+        With capture=False the output is discarded and an empty string returned.
+        The default timeout suits quick queries; slow commands pass their own.
+        """
+        if capture:
+            output_kwargs = {'capture_output': True, 'text': True}
+        else:
+            output_kwargs = {'stdout': subprocess.DEVNULL, 'stderr': subprocess.DEVNULL}
+        
         try:
             result = subprocess.run(
-                ['/usr/bin/sudo'] + command,
-                capture_output=True,
-                text=True,
-                timeout=30
+                # -n: fail immediately instead of waiting on a password prompt
+                ['/usr/bin/sudo', '-n'] + command,
+                timeout=timeout,
+                **output_kwargs
             )
+            if not capture:
+                return result.returncode == 0, ''
             return result.returncode == 0, result.stdout + result.stderr
         except subprocess.TimeoutExpired:
             return False, "Command timed out"
         except Exception as e:
             return False, str(e)
     
-    def get_service_status(self) -> Dict[str, Any]:
-        """Get DHCP service status."""
+    def _get_unit_properties(self) -> Optional[Dict[str, str]]:
+        """Read the Kea unit's state over the systemd D-Bus API.
+        
+        Returns None if dbus-python isn't installed or the bus can't be reached.
+        """
+        if dbus is None:
+            return None
+        
+        try:
+            if self._unit_props_iface is None:
+                unit = dbus.SystemBus().get_object('org.freedesktop.systemd1', self.SERVICE_UNIT_PATH)
+                self._unit_props_iface = dbus.Interface(unit, 'org.freedesktop.DBus.Properties')
+            
+            # Same limit as the systemctl fallback instead of libdbus's ~25s default
+            unit_props = self._unit_props_iface.GetAll('org.freedesktop.systemd1.Unit', timeout=5)
+        except dbus.DBusException:
+            # Drop the proxy so the next poll reconnects
+            self._unit_props_iface = None
+            return None
+        
+        return {
+            name: str(unit_props.get(name, ''))
+            for name in ('ActiveState', 'SubState', 'LoadState')
+        }
+    
+    def _systemctl_show(self) -> Optional[Dict[str, str]]:
+        """Read the Kea unit's state with a single `systemctl show` call."""
         success, output = self._run_sudo_command([
-            'systemctl', 'is-active', 'kea-dhcp4-server'
+            'systemctl', 'show', 'kea-dhcp4-server',
+            '--property=ActiveState,SubState,LoadState,MainPID'
         ])
         
-        active = success and 'active' in output.lower()
+        if not success:
+            return None
         
-        # Get service status details
-        success_status, status_output = self._run_sudo_command([
-            'systemctl', 'status', 'kea-dhcp4-server', '--no-pager'
-        ])
+        props = {}
+        for line in output.splitlines():
+            key, sep, value = line.partition('=')
+            if sep:
+                props[key.strip()] = value.strip()
+        return props
+    
+    def get_service_status(self, include_details: bool = False) -> Dict[str, Any]:
+        """Get DHCP service status.
+        
+        Prefers a D-Bus property read and falls back to `systemctl show`. The
+        human-readable `systemctl status` output is only fetched when
+        include_details is set. The unit state is reused for STATUS_CACHE_TTL
+        seconds.
+        """
+        now = time.monotonic()
+        cached = DhcpManager._status_cache
+        if cached is not None and cached[0] > now:
+            props = cached[1]
+        else:
+            props = self._get_unit_properties()
+            if props is None:
+                props = self._systemctl_show()
+            DhcpManager._status_cache = (now + self.STATUS_CACHE_TTL, props)
+        
+        active = props is not None and props.get('ActiveState') == 'active'
+        
+        if include_details:
+            # Get service status details; --lines=0 skips the journal lookup
+            success_status, status_output = self._run_sudo_command([
+                'systemctl', 'status', 'kea-dhcp4-server', '--no-pager', '--lines=0'
+            ])
+            details = status_output if success_status else 'Unable to get status'
+        elif props is not None:
+            details = '\n'.join(f"{key}={value}" for key, value in props.items())
+        else:
+            details = 'Unable to get status'
         
         return {
             'active': active,
             'status': 'active' if active else 'inactive',
-            'details': status_output if success_status else 'Unable to get status'
+            'details': details
         }
     
-    def get_config(self) -> Dict[str, Any]:
-        """Read and return current DHCP configuration."""
-        success, output = self._run_sudo_command([
-            'cat', str(self.config_path)
-        ])
+    def _kea_ctrl(self, command: str, arguments: Any = None) -> Optional[Dict[str, Any]]:
+        """Send a command to Kea's control socket and return its response.
+        
+        arguments may be a dict or already-serialized JSON bytes. Returns None
+        if the socket is unavailable or the reply can't be parsed, so callers
+        can fall back to the command-line tools.
+        """
+        if isinstance(arguments, bytes):
+            # Splice pre-serialized arguments in rather than encoding them again
+            request = b'{"command": ' + _json_dumps(command) + b', "arguments": ' + arguments + b'}'
+        else:
+            payload = {'command': command}
+            if arguments is not None:
+                payload['arguments'] = arguments
+            request = _json_dumps(payload)
         
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(10)
+                sock.connect(str(self.ctrl_socket_path))
+                sock.sendall(request)
+                
+                # Kea sends a single JSON reply; read until it parses or the peer closes
+                reply = b''
+                response = None
+                while response is None:
+                    chunk = sock.recv(65536)
+                    if not chunk:
+                        break
+                    reply += chunk
+                    try:
+                        response = _json_loads(reply)
+                    except ValueError:
+                        continue
+        except (OSError, ValueError):
+            return None
+        
+        # The control agent wraps responses in a list, one per service
+        if isinstance(response, list):
+            response = response[0] if response else None
+        
+        return response if isinstance(response, dict) else None
+    
+    def _read_file(self, path: Path) -> bytes:
+        """Read a file directly, falling back to sudo cat if permission is denied."""
+        try:
+            return path.read_bytes()
+        except PermissionError:
+            pass
+        
+        success, output = self._run_sudo_command(['cat', str(path)])
         if not success:
-            raise Exception(f"Failed to read config: {output}")
+            raise Exception(f"Failed to read {path}: {output}")
+        return output.encode('utf-8')
+    
+    def _stat_file(self, path: Path) -> Optional[tuple[int, int]]:
+        """Return (mtime_ns, size) of a file, or None if it can't be stat'ed."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+    
+    def _stat_config(self) -> Optional[tuple[int, int]]:
+        """Return (mtime_ns, size) of the config file, or None if it can't be stat'ed."""
+        return self._stat_file(self.config_path)
+    
+    def _cache_config(self, key: Optional[tuple[int, int]], config: Dict[str, Any]) -> None:
+        """Store a parsed config in the cache under the given stat key."""
+        self._invalidate_config_cache()
+        if key is None:
+            return
+        self._config_cache[self.config_path] = (key[0], key[1], copy.deepcopy(config))
+    
+    def _invalidate_config_cache(self) -> None:
+        """Drop cached config data for this manager's config path."""
+        self._config_cache.pop(self.config_path, None)
+        self._reservations_cache.pop(self.config_path, None)
+        self._reservation_index_cache.pop(self.config_path, None)
+        self._pool_range_cache.pop(self.config_path, None)
+    
+    def get_config(self, readonly: bool = False) -> Dict[str, Any]:
+        """Read and return current DHCP configuration.
+        
+        The parsed config is cached and reused until the file's mtime or size
+        changes. Callers receive a deep copy they are free to mutate, unless
+        readonly is set, in which case the shared cached dict may be returned
+        and must not be modified.
+        """
+        return self._load_config(readonly)[0]
+    
+    def _load_config(self, readonly: bool = False) -> tuple[Dict[str, Any], Optional[tuple[int, int]]]:
+        """Return the current configuration along with the stat key it was read under."""
+        key = self._stat_config()
+        cached = self._config_cache.get(self.config_path)
+        if key is not None and cached is not None and cached[:2] == key:
+            if readonly:
+                return cached[2], key
+            return copy.deepcopy(cached[2]), key
+        
+        try:
+            output = self._read_file(self.config_path)
+        except Exception as e:
+            raise Exception(f"Failed to read config: {str(e)}")
         
         # Extract JSON object from file (handles comments and extra data)
         # Find first { and last } to get the JSON object
-        first_brace = output.find('{')
-        last_brace = output.rfind('}')
+        first_brace = output.find(b'{')
+        last_brace = output.rfind(b'}')
         
         if first_brace == -1 or last_brace == -1 or last_brace <= first_brace:
             raise Exception("No valid JSON object found in config file")
         
-        json_content = output[first_brace:last_brace + 1]
+        json_content = memoryview(output)[first_brace:last_brace + 1]
         
         try:
-            return json.loads(json_content)
+            config = _json_loads(json_content)
         except json.JSONDecodeError as e:
             raise Exception(f"Invalid JSON in config file: {str(e)}")
+        
+        self._cache_config(key, config)
+        return config, key
     
     def update_config(self, config: Dict[str, Any]) -> Dict[str, Any]:
         """Update DHCP configuration file using atomic shell script."""
-        # Validate JSON structure
-        try:
-            json.dumps(config)
-        except (TypeError, ValueError) as e:
-            raise Exception(f"Invalid configuration JSON: {str(e)}")
-        
         # Validate config before writing
         if not self._validate_config_structure(config):
             raise Exception("Invalid configuration structure")
         
-        # Create temporary file with JSON config
-        config_json = json.dumps(config, indent=4)
-        
-        # Use tempfile to create a temporary file that we can pass to the script
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as tmp_file:
-            tmp_file.write(config_json)
-            tmp_file_path = tmp_file.name
+        # Serializing is also the JSON validity check
+        try:
+            config_json = _json_dumps(config)
+        except (TypeError, ValueError) as e:
+            raise Exception(f"Invalid configuration JSON: {str(e)}")
         
+        # Let the running server test the candidate config in-process. If the
+        # control socket isn't reachable the update script validates it instead.
+        response = self._kea_ctrl('config-test', config_json)
+        if response is not None and response.get('result') != 0:
+            raise Exception(f"Configuration rejected by Kea: {response.get('text', 'unknown error')}")
+        
+        # Write next to the target when possible so the script's publish step
+        # can be a same-filesystem rename instead of a copy
+        tmp_dir = self.config_path.parent
+        if not os.access(tmp_dir, os.W_OK):
+            tmp_dir = None
+        fd, tmp_file_path = tempfile.mkstemp(
+            prefix='.kea-dhcp4.', suffix='.json.tmp', dir=tmp_dir
+        )
         try:
+            try:
+                view = memoryview(config_json)
+                while view:
+                    view = view[os.write(fd, view):]
+                os.fsync(fd)
+            except OSError as e:
+                raise Exception(f"Configuration update failed: {str(e)}")
+            finally:
+                os.close(fd)
+            
             # Call the atomic update script
             script_path = '/usr/local/sbin/update-kea-dhcp.sh'
             
             # Execute the script via sudo
+            # The script validates and reloads Kea, so give it the longest budget
             success, output = self._run_sudo_command([
                 script_path, tmp_file_path
-            ])
+            ], timeout=30)
             
             if not success:
+                # The script may have touched the file before failing
+                self._invalidate_config_cache()
                 raise Exception(f"Configuration update failed: {output}")
             
-            # Return updated config
-            return self.get_config()
+            # Seed the cache with what we just wrote instead of re-reading it
+            self._cache_config(self._stat_config(), config)
+            
+            # The published file is exactly the config we were given
+            return config
         finally:
             # Clean up temporary file
             try:
@@ -127,12 +371,39 @@ class DhcpManager:
     
     def validate_config(self) -> bool:
         """Validate DHCP configuration file."""
-        success, output = self._run_sudo_command([
+        try:
+            response = self._kea_ctrl('config-test', self.get_config(readonly=True))
+        except Exception:
+            response = None
+        
+        if response is not None:
+            return response.get('result') == 0
+        
+        # Control socket unavailable, fall back to a one-shot kea-dhcp4 check
+        success, _ = self._run_sudo_command([
             'kea-dhcp4', '-t', str(self.config_path)
-        ])
+        ], capture=False, timeout=15)
         
         return success
     
+    def health_check(self) -> Dict[str, Any]:
+        """Check service state and config validity.
+        
+        The two checks are independent and spend their time waiting on
+        systemd, Kea or a subprocess, so the config check runs on a worker
+        thread while the service state is read.
+        """
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            config_future = executor.submit(self.validate_config)
+            status = self.get_service_status()
+            config_valid = config_future.result()
+        
+        return {
+            'status': 'healthy' if status['active'] and config_valid else 'unhealthy',
+            'service': status,
+            'config_valid': config_valid
+        }
+    
     def _validate_config_structure(self, config: Dict[str, Any]) -> bool:
         """Validate that config has required structure."""
         if not isinstance(config, dict):
@@ -152,7 +423,18 @@ class DhcpManager:
     
     def get_reservations(self) -> List[Dict[str, Any]]:
         """Get all static IP reservations from configuration."""
-        config = self.get_config()
+        key = self._stat_config()
+        cached = self._reservations_cache.get(self.config_path)
+        if key is not None and cached is not None and cached[:2] == key:
+            return [dict(res) for res in cached[2]]
+        
+        reservations = self._extract_reservations(self.get_config(readonly=True))
+        if key is not None:
+            self._reservations_cache[self.config_path] = (key[0], key[1], reservations)
+        return [dict(res) for res in reservations]
+    
+    def _extract_reservations(self, config: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Flatten reservations from an already-parsed configuration."""
         reservations = []
         
         try:
@@ -160,8 +442,9 @@ class DhcpManager:
             for subnet in subnet4:
                 subnet_reservations = subnet.get('reservations', [])
                 for reservation in subnet_reservations:
+                    # MACs are case-insensitive; normalize once here so callers compare directly
                     reservations.append({
-                        'hw-address': reservation.get('hw-address', ''),
+                        'hw-address': reservation.get('hw-address', '').lower(),
                         'ip-address': reservation.get('ip-address', ''),
                         'hostname': reservation.get('hostname', '')
                     })
@@ -176,21 +459,21 @@ class DhcpManager:
         If ip_address is not provided or is in pool range, automatically assigns
         the next available IP from reserved range (2 up to 49).
         """
-        config = self.get_config()
+        config, key = self._load_config()
         
         if not self._validate_mac_address(hw_address):
             raise Exception(f"Invalid MAC address: {hw_address}")
         
         # Check if reservation already exists
-        existing = self.get_reservations()
-        for res in existing:
-            if res['hw-address'].lower() == hw_address.lower():
-                raise Exception("Reservation with this MAC address already exists")
+        index = self._get_reservation_index(config, key)
+        hw_lower = hw_address.lower()
+        if hw_lower in index:
+            raise Exception("Reservation with this MAC address already exists")
         
         # Determine IP address to use
         if not ip_address:
             # Auto-assign from reserved range
-            ip_address = self._get_next_available_reserved_ip()
+            ip_address = self._get_next_available_reserved_ip(self._extract_reservations(config))
             if not ip_address:
                 raise Exception("No available IP addresses in reserved range (192.168.123.2 - 192.168.123.49)")
         else:
@@ -199,8 +482,8 @@ class DhcpManager:
                 raise Exception(f"Invalid IP address: {ip_address}")
             
             # If IP is in pool range, auto-assign from reserved range instead
-            if self._validate_ip_in_pool(ip_address):
-                ip_address = self._get_next_available_reserved_ip()
+            if self._validate_ip_in_pool(ip_address, config, key):
+                ip_address = self._get_next_available_reserved_ip(self._extract_reservations(config))
                 if not ip_address:
                     raise Exception("No available IP addresses in reserved range (192.168.123.2 - 192.168.123.49)")
             else:
@@ -210,11 +493,9 @@ class DhcpManager:
                     raise Exception(f"IP address {ip_address} is outside the reserved range ({start_ip} - {end_ip})")
         
         # Check if IP is already assigned
-        for res in existing:
-            if res['ip-address'] == ip_address:
-                raise Exception("IP address is already assigned to another reservation")
+        if ip_address in index:
+            raise Exception("IP address is already assigned to another reservation")
         
-        # Also check in-memory config structure before adding
         subnet4 = config.get('Dhcp4', {}).get('subnet4', [])
         if not subnet4:
             raise Exception("No subnet4 configuration found")
@@ -223,17 +504,10 @@ class DhcpManager:
         if 'reservations' not in subnet:
             subnet['reservations'] = []
         
-        # Check for duplicates in the in-memory config as well
-        for res in subnet['reservations']:
-            if res.get('hw-address', '').lower() == hw_address.lower():
-                raise Exception("Reservation with this MAC address already exists")
-            if res.get('ip-address', '') == ip_address:
-                raise Exception("IP address is already assigned to another reservation")
-        
         # Add reservation to first subnet
         try:
             new_reservation = {
-                'hw-address': hw_address.lower(),
+                'hw-address': hw_lower,
                 'ip-address': ip_address
             }
             
@@ -243,130 +517,204 @@ class DhcpManager:
             subnet['reservations'].append(new_reservation)
             
             # Update config
-            updated_config = self.update_config(config)
+            self.update_config(config)
             
             # Return the new reservation
             return new_reservation
         except Exception as e:
             raise Exception(f"Failed to add reservation: {str(e)}")
     
+    def _get_reservation_index(self, config: Dict[str, Any], key: Optional[tuple[int, int]]) -> Dict[str, tuple[int, int]]:
+        """Map lowercased MACs and IPs to their (subnet, reservation) position in config."""
+        cached = self._reservation_index_cache.get(self.config_path)
+        if key is not None and cached is not None and cached[:2] == key:
+            return cached[2]
+        
+        index = {}
+        subnet4 = config.get('Dhcp4', {}).get('subnet4', [])
+        for subnet_idx, subnet in enumerate(subnet4):
+            for res_idx, reservation in enumerate(subnet.get('reservations', [])):
+                mac = reservation.get('hw-address', '').lower()
+                ip = reservation.get('ip-address', '')
+                # First match wins, mirroring a front-to-back scan
+                if mac:
+                    index.setdefault(mac, (subnet_idx, res_idx))
+                if ip:
+                    index.setdefault(ip, (subnet_idx, res_idx))
+        
+        if key is not None:
+            self._reservation_index_cache[self.config_path] = (key[0], key[1], index)
+        return index
+    
     def remove_reservation(self, identifier: str) -> bool:
         """Remove a reservation by MAC address or IP address."""
-        config = self.get_config()
+        config, key = self._load_config()
         
         try:
-            subnet4 = config.get('Dhcp4', {}).get('subnet4', [])
-            for subnet in subnet4:
-                if 'reservations' in subnet:
-                    reservations = subnet['reservations']
-                    # Remove matching reservation
-                    original_count = len(reservations)
-                    subnet['reservations'] = [
-                        r for r in reservations
-                        if r.get('hw-address', '').lower() != identifier.lower()
-                        and r.get('ip-address', '') != identifier
-                    ]
-                    
-                    if len(subnet['reservations']) < original_count:
-                        # Reservation was removed, update config
-                        self.update_config(config)
-                        return True
+            index = self._get_reservation_index(config, key)
+            location = index.get(identifier.lower()) or index.get(identifier)
+            if location is None:
+                return False
             
-            return False
+            subnet_idx, res_idx = location
+            del config['Dhcp4']['subnet4'][subnet_idx]['reservations'][res_idx]
+            
+            # Reservation was removed, update config
+            self.update_config(config)
+            return True
         except Exception as e:
             raise Exception(f"Failed to remove reservation: {str(e)}")
     
     def get_leases(self) -> List[Dict[str, Any]]:
-        """Get active DHCP leases from lease database."""
+        """Get active DHCP leases from lease database.
+        
+        Parsed leases are cached until the lease file's mtime or size changes;
+        expiry is re-checked against the current time on every call.
+        """
         leases = []
         
         # Try to read lease database
         if not self.lease_db_path.exists():
             return leases
         
-        try:
-            success, output = self._run_sudo_command([
-                'cat', str(self.lease_db_path)
-            ])
-            
-            if not success:
+        key = self._stat_file(self.lease_db_path)
+        cached = self._lease_cache.get(self.lease_db_path)
+        if key is not None and cached is not None and cached[:2] == key:
+            entries = cached[2]
+        else:
+            parsed = self._read_leases()
+            if parsed is None:
                 return leases
+            entries = [(int(lease['expire']), lease) for lease in parsed]
+            if key is not None:
+                self._lease_cache[self.lease_db_path] = (key[0], key[1], entries)
+        
+        current_time = int(time.time())
+        return [dict(lease) for expire_time, lease in entries if expire_time > current_time]
+    
+    def _read_leases(self) -> Optional[List[Dict[str, Any]]]:
+        """Read and parse the lease database, or return None if it can't be read."""
+        try:
+            try:
+                # Stream rows straight from the file when we can read it
+                with open(self.lease_db_path, 'r', buffering=1 << 16, newline='', encoding='utf-8', errors='replace') as f:
+                    return self._parse_leases(f)
+            except PermissionError:
+                pass
             
-            # Use dict keyed by MAC address to automatically deduplicate
-            leases_by_mac = {}
-            current_time = int(time.time())
-            
-            # Parse CSV lease database using proper CSV parser
-            # Format: address,hwaddr,client_id,valid_lifetime,expire,subnet_id,fqdn_fwd,fqdn_rev,hostname,state,user_context
-            csv_content = StringIO(output)
-            reader = csv.DictReader(csv_content)
-            
-            for row in reader:
-                # Only include active leases (state=0 and not expired)
-                try:
-                    expire_time = int(row['expire']) if row.get('expire') else 0
-                    state = int(row['state']) if row.get('state') else 1
-                except (ValueError, KeyError):
-                    continue
-                
-                if state == 0 and expire_time > current_time:
-                    mac = row.get('hwaddr', '')
-                    if not mac:
-                        continue
-                    
-                    # Keep the lease with the latest expiration time for each MAC
-                    if mac not in leases_by_mac or expire_time > leases_by_mac[mac]['_expire']:
-                        leases_by_mac[mac] = {
-                            'ip-address': row.get('address', ''),
-                            'hw-address': mac,
-                            'hostname': row.get('hostname', ''),
-                            'expire': str(expire_time),
-                            'state': str(state),
-                            '_expire': expire_time  # Internal field for comparison
-                        }
-            
-            # Convert dict to list and remove internal expire field
-            for lease in leases_by_mac.values():
-                lease.pop('_expire', None)  # Remove internal field
-                leases.append(lease)
+            # Stream sudo cat's output into the parser instead of buffering the whole file
+            proc = subprocess.Popen(
+                ['/usr/bin/sudo', '-n', 'cat', str(self.lease_db_path)],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                bufsize=1 << 16
+            )
+            try:
+                with TextIOWrapper(proc.stdout, encoding='utf-8', errors='replace', newline='') as stream:
+                    parsed = self._parse_leases(stream)
                 
+                if proc.wait(timeout=5) != 0:
+                    return None
+                return parsed
+            finally:
+                if proc.poll() is None:
+                    proc.kill()
+                    proc.wait()
         except Exception as e:
-            # If we can't read leases, return empty list
+            # If we can't read leases, callers treat it as no leases
             # This is not a critical error
-            pass
-        
-        return leases
+            return None
+    
+    def _parse_leases(self, lines: Iterable[str]) -> List[Dict[str, Any]]:
+        """Parse active leases from Kea CSV lease database lines."""
+        # MAC -> (expire, row) for the latest-expiring lease; dicts are built for winners only
+        winners: Dict[str, tuple[int, List[str]]] = {}
+        current_time = int(time.time())
+        current_time_str = str(current_time)
+        
+        # Parse CSV lease database using proper CSV parser
+        # Format: address,hwaddr,client_id,valid_lifetime,expire,subnet_id,fqdn_fwd,fqdn_rev,hostname,state,user_context
+        reader = csv.reader(lines)
+        
+        # Resolve column positions once from the header instead of building a dict per row
+        header = next(reader, None)
+        if not header:
+            return []
+        try:
+            address_i = header.index('address')
+            hwaddr_i = header.index('hwaddr')
+            expire_i = header.index('expire')
+            state_i = header.index('state')
+        except ValueError:
+            return []
+        hostname_i = header.index('hostname') if 'hostname' in header else None
+        # Every column read below is covered by this one length check; Kea's own
+        # loader rejects short rows too
+        min_len = max(address_i, hwaddr_i, expire_i, state_i,
+                      hostname_i if hostname_i is not None else 0) + 1
+        
+        for row in reader:
+            # Skip truncated rows so the loop can index columns directly
+            if len(row) < min_len:
+                continue
+            
+            # Only include active leases (state=0 and not expired). Most rows in
+            # a long-running lease file are released/expired, so reject on the
+            # raw state string before parsing anything.
+            if row[state_i] != '0':
+                continue
+            
+            # Equal-width decimal epochs sort like their values, so most expired
+            # rows are dropped with a string comparison before int() is needed
+            expire_str = row[expire_i]
+            if len(expire_str) == len(current_time_str) and expire_str <= current_time_str:
+                continue
+            
+            try:
+                expire_time = int(expire_str)
+            except ValueError:
+                continue
+            
+            if expire_time <= current_time:
+                continue
+            
+            # Lowercase once here so callers can compare against reservation MACs directly
+            mac = row[hwaddr_i].lower()
+            if not mac:
+                continue
+            
+            # Keep the lease with the latest expiration time for each MAC
+            current = winners.get(mac)
+            if current is None or expire_time > current[0]:
+                winners[mac] = (expire_time, row)
+        
+        return [
+            {
+                'ip-address': row[address_i],
+                'hw-address': mac,
+                'hostname': row[hostname_i] if hostname_i is not None else '',
+                'expire': str(expire_time),
+                'state': '0'
+            }
+            for mac, (expire_time, row) in winners.items()
+        ]
     
     def _validate_ip_address(self, ip: str) -> bool:
         """Validate IP address format."""
-        try:
-            parts = ip.split('.')
-            if len(parts) != 4:
-                return False
-            for part in parts:
-                num = int(part)
-                if num < 0 or num > 255:
-                    return False
-            return True
-        except (ValueError, AttributeError):
-            return False
+        return self._ip_to_int(ip) is not None
     
     def _validate_mac_address(self, mac: str) -> bool:
         """Validate MAC address format."""
-        try:
-            parts = mac.replace(':', '-').split('-')
-            if len(parts) != 6:
-                return False
-            for part in parts:
-                int(part, 16)
-            return True
-        except (ValueError, AttributeError):
+        # Every valid form is exactly 17 characters; reject anything else before matching
+        if not isinstance(mac, str) or len(mac) != 17:
             return False
+        return _MAC_RE.fullmatch(mac) is not None
     
-    def _get_pool_range(self) -> tuple[Optional[str], Optional[str]]:
+    def _get_pool_range(self, config: Optional[Dict[str, Any]] = None) -> tuple[Optional[str], Optional[str]]:
         """Extract IP pool range from configuration."""
         try:
-            config = self.get_config()
+            if config is None:
+                config = self.get_config(readonly=True)
             subnet4 = config.get('Dhcp4', {}).get('subnet4', [])
             if not subnet4:
                 return None, None
@@ -390,25 +738,30 @@ class DhcpManager:
         """Get the reserved IP range for pinned reservations (2-49)."""
         return ("192.168.123.2", "192.168.123.49")
     
-    def get_current_boundary(self) -> int:
+    def get_current_boundary(self, config: Optional[Dict[str, Any]] = None) -> int:
         """Get the current max reservations boundary from config.
         
         Returns the maximum number of reservations based on the current
         pool configuration. Calculates backwards from the pool start IP.
         If no pool exists, all IPs are reserved (max_reservations = 249).
         
+        Args:
+            config: Already-loaded configuration to use instead of reading it again
+        
         Returns:
             Maximum reservations count (boundary value)
         """
         try:
-            start_ip, end_ip = self._get_pool_range()
+            if config is None:
+                config = self.get_config(readonly=True)
+            
+            start_ip, end_ip = self._get_pool_range(config)
             print(f"[DHCP] get_current_boundary: pool range = {start_ip} - {end_ip}")
             
             if not start_ip:
                 print("[DHCP] get_current_boundary: No pool found - checking if all IPs are reserved")
                 # If no pool exists, check if we have a reserved range that goes to 250
                 # If all IPs are reserved (2-250), max_reservations = 249
-                config = self.get_config()
                 subnet4 = config.get('Dhcp4', {}).get('subnet4', [])
                 if subnet4:
                     subnet = subnet4[0]
@@ -458,72 +811,76 @@ class DhcpManager:
     def _ip_to_int(self, ip: str) -> Optional[int]:
         """Convert IP address to integer for comparison."""
         try:
-            parts = ip.split('.')
-            if len(parts) != 4:
-                return None
-            return int(parts[0]) * 256**3 + int(parts[1]) * 256**2 + int(parts[2]) * 256 + int(parts[3])
-        except (ValueError, AttributeError):
+            return int.from_bytes(socket.inet_pton(socket.AF_INET, ip), 'big')
+        except (OSError, TypeError, ValueError):
             return None
     
-    def _validate_ip_in_pool(self, ip: str) -> bool:
-        """Validate IP address is within configured pool range."""
-        if not self._validate_ip_address(ip):
-            return False
+    def _get_pool_range_int(self, config: Dict[str, Any], key: Optional[tuple[int, int]]) -> Optional[tuple[Optional[int], Optional[int]]]:
+        """Return the pool range as integers, or None if there is no pool range.
+        
+        The result is cached per config version, like the reservation index.
+        """
+        cached = self._pool_range_cache.get(self.config_path)
+        if key is not None and cached is not None and cached[:2] == key:
+            return cached[2]
         
-        start_ip, end_ip = self._get_pool_range()
+        start_ip, end_ip = self._get_pool_range(config)
         if not start_ip or not end_ip:
-            # If pool range can't be determined, just validate format
-            return True
+            pool_range = None
+        else:
+            pool_range = (self._ip_to_int(start_ip), self._ip_to_int(end_ip))
+        
+        if key is not None:
+            self._pool_range_cache[self.config_path] = (key[0], key[1], pool_range)
+        return pool_range
+    
+    def _validate_ip_in_pool(self, ip: str, config: Optional[Dict[str, Any]] = None,
+                             key: Optional[tuple[int, int]] = None) -> bool:
+        """Validate IP address is within configured pool range.
         
+        Pass key along with config when the config came from _load_config so
+        the parsed range can be reused.
+        """
         ip_int = self._ip_to_int(ip)
-        start_int = self._ip_to_int(start_ip)
-        end_int = self._ip_to_int(end_ip)
+        if ip_int is None:
+            return False
+        
+        if config is None:
+            try:
+                config, key = self._load_config(readonly=True)
+            except Exception:
+                # Config unreadable, so the pool range can't be determined either
+                return True
+        
+        pool_range = self._get_pool_range_int(config, key)
+        if pool_range is None:
+            # If pool range can't be determined, just validate format
+            return True
         
-        if ip_int is None or start_int is None or end_int is None:
+        start_int, end_int = pool_range
+        if start_int is None or end_int is None:
             return False
         
         return start_int <= ip_int <= end_int
     
     def _validate_ip_in_reserved_range(self, ip: str) -> bool:
         """Validate IP address is within reserved range for pinned reservations (2-49)."""
-        if not self._validate_ip_address(ip):
-            return False
-        
-        start_ip, end_ip = self._get_reserved_range()
         ip_int = self._ip_to_int(ip)
-        start_int = self._ip_to_int(start_ip)
-        end_int = self._ip_to_int(end_ip)
-        
-        if ip_int is None or start_int is None or end_int is None:
+        if ip_int is None:
             return False
         
-        return start_int <= ip_int <= end_int
+        return self.RESERVED_START_INT <= ip_int <= self.RESERVED_END_INT
     
-    def _get_next_available_reserved_ip(self) -> Optional[str]:
+    def _get_next_available_reserved_ip(self, existing_reservations: Optional[List[Dict[str, Any]]] = None) -> Optional[str]:
         """Find the next available IP in reserved range (2 up to 49)."""
-        existing_reservations = self.get_reservations()
-        used_ips = {res['ip-address'] for res in existing_reservations}
-        
-        start_ip, end_ip = self._get_reserved_range()
-        start_int = self._ip_to_int(start_ip)
-        end_int = self._ip_to_int(end_ip)
+        if existing_reservations is None:
+            existing_reservations = self.get_reservations()
+        used_ints = {self._ip_to_int(res['ip-address']) for res in existing_reservations}
         
-        if start_int is None or end_int is None:
-            return None
-        
-        # Check from 2 up to 49 (ascending)
-        for ip_int in range(start_int, end_int + 1, 1):
-            # Convert integer back to IP string
-            ip_parts = [
-                (ip_int >> 24) & 0xFF,
-                (ip_int >> 16) & 0xFF,
-                (ip_int >> 8) & 0xFF,
-                ip_int & 0xFF
-            ]
-            ip_str = f"{ip_parts[0]}.{ip_parts[1]}.{ip_parts[2]}.{ip_parts[3]}"
-            
-            if ip_str not in used_ips:
-                return ip_str
+        # Check from 2 up to 49 (ascending), formatting only the winner
+        for ip_int in range(self.RESERVED_START_INT, self.RESERVED_END_INT + 1):
+            if ip_int not in used_ints:
+                return socket.inet_ntoa(ip_int.to_bytes(4, 'big'))
         
         # All IPs in reserved range are taken
         return None
@@ -533,7 +890,8 @@ class DhcpManager:
         
         Validates that the new IP is within the reserved range (2-49).
         """
-        config = self.get_config()
+        config, key = self._load_config()
+        identifier_lower = identifier.lower()
         
         # Validate new IP address
         if not self._validate_ip_address(new_ip):
@@ -544,51 +902,40 @@ class DhcpManager:
             start_ip, end_ip = self._get_reserved_range()
             raise Exception(f"IP address {new_ip} is outside the reserved range ({start_ip} - {end_ip})")
         
+        index = self._get_reservation_index(config, key)
+        location = index.get(identifier_lower) or index.get(identifier)
+        
         # Check if new IP is already assigned to another reservation
-        existing = self.get_reservations()
-        for res in existing:
-            if res['ip-address'] == new_ip:
-                # Allow if it's the same reservation we're updating
-                if res['hw-address'].lower() != identifier.lower() and res['ip-address'] != identifier:
-                    raise Exception("IP address is already assigned to another reservation")
+        # (allowed if it's the same reservation we're updating)
+        owner = index.get(new_ip)
+        if owner is not None and owner != location:
+            raise Exception("IP address is already assigned to another reservation")
         
         # Find and update the reservation
         try:
-            subnet4 = config.get('Dhcp4', {}).get('subnet4', [])
-            found = False
-            
-            for subnet in subnet4:
-                if 'reservations' in subnet:
-                    for reservation in subnet['reservations']:
-                        # Match by MAC or IP
-                        if (reservation.get('hw-address', '').lower() == identifier.lower() or
-                            reservation.get('ip-address', '') == identifier):
-                            reservation['ip-address'] = new_ip
-                            found = True
-                            break
-                    if found:
-                        break
-            
-            if not found:
+            if location is None:
                 raise Exception("Reservation not found")
             
-            # Update config
-            updated_config = self.update_config(config)
+            subnet_idx, res_idx = location
+            target = config['Dhcp4']['subnet4'][subnet_idx]['reservations'][res_idx]
+            target['ip-address'] = new_ip
             
-            # Return updated reservation
-            updated_reservations = self.get_reservations()
-            for res in updated_reservations:
-                if res['hw-address'].lower() == identifier.lower() or res['ip-address'] == new_ip:
-                    return res
+            # Update config
+            self.update_config(config)
             
-            raise Exception("Failed to retrieve updated reservation")
+            # Return updated reservation straight from the config we just published
+            return {
+                'hw-address': target.get('hw-address', '').lower(),
+                'ip-address': new_ip,
+                'hostname': target.get('hostname', '')
+            }
         except Exception as e:
             raise Exception(f"Failed to update reservation: {str(e)}")
     
     def get_statistics(self) -> Dict[str, Any]:
         """Get DHCP statistics including homeserver IP, reservation count, and lease count."""
         try:
-            config = self.get_config()
+            config = self.get_config(readonly=True)
             
             # Extract homeserver IP from routers option
             homeserver_ip = "192.168.123.1"  # Default
@@ -605,14 +952,14 @@ class DhcpManager:
                 pass  # Use default if extraction fails
             
             # Get reservation count
-            reservations = self.get_reservations()
+            reservations = self._extract_reservations(config)
             reservations_count = len(reservations)
             
             # Calculate reservations_total based on current pool boundary
             # Get the current boundary to determine the actual reserved range
             try:
                 print(f"[DHCP] get_statistics: Calling get_current_boundary()...")
-                max_reservations = self.get_current_boundary()
+                max_reservations = self.get_current_boundary(config)
                 print(f"[DHCP] get_statistics: get_current_boundary() returned {max_reservations}")
                 # Reserved range: 192.168.123.2 to 192.168.123.(max_reservations+1)
                 # Total = max_reservations (since we have IPs from 2 to max_reservations+1, that's max_reservations IPs)
@@ -628,15 +975,14 @@ class DhcpManager:
             # Get lease count
             # Only count leases that are NOT reservations (active leases for non-reserved devices)
             leases = self.get_leases()
-            reservations = self.get_reservations()
-            reserved_macs = {res['hw-address'].lower() for res in reservations}
+            reserved_macs = {res['hw-address'] for res in reservations}
             
             # Filter out leases that match reservations by MAC address
-            active_leases = [lease for lease in leases if lease['hw-address'].lower() not in reserved_macs]
+            active_leases = [lease for lease in leases if lease['hw-address'] not in reserved_macs]
             leases_count = len(active_leases)
             
             # Calculate pool total
-            start_ip, end_ip = self._get_pool_range()
+            start_ip, end_ip = self._get_pool_range(config)
             leases_total = 0
             if start_ip and end_ip:
                 start_int = self._ip_to_int(start_ip)
@@ -675,14 +1021,14 @@ class DhcpManager:
         # - Hosts = unique MAC addresses (devices)
         # - Leases = IP addresses currently leased/assigned (active DHCP leases for non-reserved devices)
         # - Reservations = fixed IP assignments to MAC addresses
-        current_reservations = len(self.get_reservations())
+        reservations = self._extract_reservations(config)
+        current_reservations = len(reservations)
         
         # Get active leases and filter out those that are reservations
         # Only count leases for devices that don't have reservations
         leases = self.get_leases()
-        reservations = self.get_reservations()
-        reserved_macs = {res['hw-address'].lower() for res in reservations}
-        active_leases = [lease for lease in leases if lease['hw-address'].lower() not in reserved_macs]
+        reserved_macs = {res['hw-address'] for res in reservations}
+        active_leases = [lease for lease in leases if lease['hw-address'] not in reserved_macs]
         current_leases = len(active_leases)  # Active leases (non-reserved devices)
         
         total_ips = 249  # 192.168.123.2 to 192.168.123.250
@@ -20,7 +20,8 @@ dhcp_manager = DhcpManager()
 def get_status():
     """Get the status of the DHCP service."""
     try:
-        status = dhcp_manager.get_service_status()
+        include_details = request.args.get('details', '').lower() in ('1', 'true')
+        status = dhcp_manager.get_service_status(include_details=include_details)
         return jsonify({
             'success': True,
             'status': status
@@ -208,14 +209,7 @@ def update_config():
 def health_check():
     """Health check endpoint for monitoring."""
     try:
-        status = dhcp_manager.get_service_status()
-        config_valid = dhcp_manager.validate_config()
-        
-        return jsonify({
-            'status': 'healthy' if status['active'] and config_valid else 'unhealthy',
-            'service': status,
-            'config_valid': config_valid
-        })
+        return jsonify(dhcp_manager.health_check())
     except Exception as e:
         return jsonify({
             'status': 'unhealthy',